@@ -11,15 +11,27 @@ import numpy as np
 from src.data_processing import load_and_clean_data, get_column_descriptions
 from src.filters import apply_filters, get_filter_options
 from src.scoring import calculate_fund_score, get_top_funds, PRESET_PROFILES, explain_score
-from src.visualizations import (
-    plot_risk_return_scatter,
-    plot_top_funds_comparison,
-    plot_fund_radar,
-    plot_fees_comparison,
-    create_fund_summary_table,
-    plot_score_breakdown,
-    plot_by_category
-)
+# Las visualizaciones (Plotly) se importan dentro de cada pestaña para no
+# retrasar el primer render de la página
+
+# Etiquetas de los selectores del sidebar
+_HORIZONTE_LABELS = {
+    'corto': 'Corto plazo (< 2 años)',
+    'medio': 'Medio plazo (2-5 años)',
+    'largo': 'Largo plazo (> 5 años)'
+}
+
+_TOLERANCIA_LABELS = {
+    'conservador': '🛡️ Conservador',
+    'moderado': '⚖️ Moderado',
+    'agresivo': '🚀 Agresivo'
+}
+
+_BENEFICIO_LABELS = {
+    'todos': 'Todos',
+    'acumulado': 'Solo Acumulado',
+    'distribuido': 'Solo Distribuido'
+}
 
 # Configuración de la página
 st.set_page_config(
@@ -56,10 +68,46 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-@st.cache_data
+@st.cache_resource
 def cargar_datos():
-    """Carga y cachea los datos de fondos."""
-    return load_and_clean_data('funds.xlsx')
+    """Carga los datos de fondos y las opciones de filtro, compartidos entre sesiones.
+    
+    El DataFrame devuelto es el mismo objeto para todas las sesiones:
+    debe tratarse como de solo lectura.
+    """
+    df = load_and_clean_data('funds.xlsx')
+    return df, get_filter_options(df)
+
+
+def _freeze(d):
+    """Convierte un dict (con listas como valores) en una tupla hashable."""
+    return tuple(sorted((k, tuple(v) if isinstance(v, list) else v) for k, v in d.items()))
+
+
+# Entradas por caché: la clave incluye la inversión y el TER (valores libres)
+# y la caché es global entre sesiones, así que se acota
+_CACHE_MAX_ENTRIES = 64
+
+
+@st.cache_data(show_spinner=False, max_entries=_CACHE_MAX_ENTRIES)
+def _apply_filters_cached(_df, frozen_filters):
+    """Aplica los filtros cacheando por combinación de filtros.
+    
+    _df no se hashea (prefijo '_'): es siempre el DataFrame de cargar_datos.
+    """
+    return apply_filters(_df, dict(frozen_filters))
+
+
+@st.cache_data(show_spinner=False, max_entries=_CACHE_MAX_ENTRIES)
+def _score_cached(_filtered_df, frozen_filters, weights_tuple):
+    """Calcula el scoring cacheando por filtros y pesos.
+    
+    _filtered_df no se hashea: queda identificado por frozen_filters.
+    """
+    profile, custom = weights_tuple
+    if custom:
+        return calculate_fund_score(_filtered_df, custom_weights=dict(custom))
+    return calculate_fund_score(_filtered_df, weights=profile)
 
 
 def main():
@@ -69,8 +117,7 @@ def main():
     
     # Cargar datos
     try:
-        df = cargar_datos()
-        filter_options = get_filter_options(df)
+        df, filter_options = cargar_datos()
     except Exception as e:
         st.error(f"Error al cargar datos: {e}")
         st.stop()
@@ -92,11 +139,7 @@ def main():
         horizonte = st.selectbox(
             "⏱️ Horizonte temporal",
             options=['corto', 'medio', 'largo'],
-            format_func=lambda x: {
-                'corto': 'Corto plazo (< 2 años)',
-                'medio': 'Medio plazo (2-5 años)',
-                'largo': 'Largo plazo (> 5 años)'
-            }[x],
+            format_func=_HORIZONTE_LABELS.__getitem__,
             index=1
         )
         
@@ -104,11 +147,7 @@ def main():
         tolerancia = st.selectbox(
             "📊 Tolerancia al riesgo",
             options=['conservador', 'moderado', 'agresivo'],
-            format_func=lambda x: {
-                'conservador': '🛡️ Conservador',
-                'moderado': '⚖️ Moderado',
-                'agresivo': '🚀 Agresivo'
-            }[x],
+            format_func=_TOLERANCIA_LABELS.__getitem__,
             index=1
         )
         
@@ -168,11 +207,7 @@ def main():
         beneficio = st.selectbox(
             "📈 Tipo de beneficio",
             options=['todos', 'acumulado', 'distribuido'],
-            format_func=lambda x: {
-                'todos': 'Todos',
-                'acumulado': 'Solo Acumulado',
-                'distribuido': 'Solo Distribuido'
-            }[x]
+            format_func=_BENEFICIO_LABELS.__getitem__
         )
         
         st.markdown("---")
@@ -236,7 +271,8 @@ def main():
         filters['solo_distribuido'] = True
     
     # Aplicar filtros
-    filtered_df = apply_filters(df, filters)
+    frozen_filters = _freeze(filters)
+    filtered_df = _apply_filters_cached(df, frozen_filters)
     
     # Calcular scores
     if usar_custom:
@@ -250,9 +286,10 @@ def main():
             'rating_morningstar': peso_rating,
             'rating_sostenibilidad': peso_esg,
         }
-        scored_df = calculate_fund_score(filtered_df, custom_weights=custom_weights)
+        weights_tuple = (None, _freeze(custom_weights))
     else:
-        scored_df = calculate_fund_score(filtered_df, weights=perfil_scoring)
+        weights_tuple = (perfil_scoring, None)
+    scored_df = _score_cached(filtered_df, frozen_filters, weights_tuple)
     
     # Métricas principales
     col1, col2, col3, col4 = st.columns(4)
@@ -284,6 +321,7 @@ def main():
         top_10 = scored_df.head(10)
         
         # Tabla resumen
+        from src.tables import create_fund_summary_table
         tabla = create_fund_summary_table(top_10)
         st.dataframe(tabla, use_container_width=True, hide_index=True)
         
@@ -312,6 +350,7 @@ def main():
         )
         
         if viz_option == "Riesgo vs Rendimiento":
+            from src.visualizations import plot_risk_return_scatter
             fig = plot_risk_return_scatter(
                 scored_df,
                 title='Relación Riesgo - Rendimiento',
@@ -320,10 +359,12 @@ def main():
             st.plotly_chart(fig, use_container_width=True)
             
         elif viz_option == "Comparación Top 10":
+            from src.visualizations import plot_top_funds_comparison
             fig = plot_top_funds_comparison(scored_df, n=10)
             st.plotly_chart(fig, use_container_width=True)
             
         elif viz_option == "Desglose del Score":
+            from src.visualizations import plot_score_breakdown
             fig = plot_score_breakdown(scored_df, n=10)
             if fig:
                 st.plotly_chart(fig, use_container_width=True)
@@ -331,6 +372,7 @@ def main():
                 st.info("No hay datos suficientes para mostrar el desglose")
                 
         elif viz_option == "Comparación de Comisiones":
+            from src.visualizations import plot_fees_comparison
             fig = plot_fees_comparison(scored_df, n=10)
             st.plotly_chart(fig, use_container_width=True)
     
@@ -395,6 +437,7 @@ def main():
             
             # Radar chart
             try:
+                from src.visualizations import plot_fund_radar
                 fig = plot_fund_radar(fondo, weights=perfil_scoring)
                 st.plotly_chart(fig, use_container_width=True)
             except:
@@ -414,11 +457,13 @@ def main():
         )
         
         if analisis_option == "Rendimiento por Tipo de Activo":
+            from src.visualizations import plot_by_category
             fig = plot_by_category(df, 'Tipo de activo', 'Ren. últ. 12 meses_clean', 
                                    agg='mean', title='Rendimiento Promedio 12M por Tipo de Activo (%)')
             st.plotly_chart(fig, use_container_width=True)
             
         elif analisis_option == "Rendimiento por Región":
+            from src.visualizations import plot_by_category
             fig = plot_by_category(df, 'Región', 'Ren. últ. 12 meses_clean', 
                                    agg='mean', title='Rendimiento Promedio 12M por Región (%)')
             st.plotly_chart(fig, use_container_width=True)
@@ -432,6 +477,7 @@ def main():
             st.plotly_chart(fig, use_container_width=True)
             
         elif analisis_option == "Scatter General":
+            from src.visualizations import plot_risk_return_scatter
             fig = plot_risk_return_scatter(df, title='Universo Completo: Riesgo vs Rendimiento 12M')
             st.plotly_chart(fig, use_container_width=True)
         
@@ -4,12 +4,22 @@
 from .data_processing import load_and_clean_data, clean_percentage, clean_currency
 from .filters import apply_filters, get_filter_options
 from .scoring import calculate_fund_score, get_preset_weights, PRESET_PROFILES
-from .visualizations import (
-    plot_risk_return_scatter,
-    plot_top_funds_comparison,
-    plot_fund_radar,
-    plot_fees_comparison,
-    create_fund_summary_table
-)
+from .tables import create_fund_summary_table
 
 __version__ = "1.0.0"
+
+# Las visualizaciones dependen de Plotly/Matplotlib, cuya importación es
+# costosa: se cargan solo cuando se accede a ellas
+_LAZY_VISUALIZATIONS = (
+    'plot_risk_return_scatter',
+    'plot_top_funds_comparison',
+    'plot_fund_radar',
+    'plot_fees_comparison',
+)
+
+
+def __getattr__(name):
+    if name in _LAZY_VISUALIZATIONS:
+        from . import visualizations
+        return getattr(visualizations, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
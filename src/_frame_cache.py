@@ -0,0 +1,98 @@
+"""
+Memoización de funciones cuyo primer argumento es un DataFrame.
+
+Los DataFrames no son hashables, así que los resultados se guardan por un
+token asignado a cada DataFrame la primera vez que se ve. Regla de
+invalidación única: cuando un DataFrame se libera, sus resultados se
+eliminan; un DataFrame nuevo (aunque reutilice el id de otro ya liberado)
+recibe un token nuevo, de modo que nunca se devuelven resultados de otro.
+
+Los DataFrames se tratan como inmutables: si se modifican en sitio, la
+caché no lo detecta.
+"""
+
+import collections
+import functools
+import itertools
+import threading
+import weakref
+
+
+_TOKENS = itertools.count()
+
+
+def memoize_by_frame(maxsize):
+    """
+    Decorador que memoiza func(df, *args) por identidad de df y args.
+
+    Parameters:
+    -----------
+    maxsize : int
+        Número máximo de resultados guardados (LRU)
+
+    Returns:
+    --------
+    callable
+        Decorador; la función decorada expone cache_clear()
+    """
+    def decorator(func):
+        lock = threading.Lock()
+        # (token, args) -> resultado, en orden de uso (LRU)
+        results = collections.OrderedDict()
+        # id(df) -> token, solo para DataFrames vivos
+        tokens = {}
+        # Tokens de DataFrames liberados cuyos resultados faltan por borrar
+        dead = []
+
+        def purge():
+            # Llamar con el lock tomado
+            while dead:
+                token = dead.pop()
+                for key in [key for key in results if key[0] == token]:
+                    del results[key]
+
+        def release(df_id, token):
+            # weakref.finalize: el DataFrame se ha liberado
+            if tokens.get(df_id) == token:
+                del tokens[df_id]
+            dead.append(token)
+            # Puede ejecutarse durante una recolección con el lock tomado (en
+            # este u otro hilo): en ese caso se purga en la siguiente llamada
+            if lock.acquire(blocking=False):
+                try:
+                    purge()
+                finally:
+                    lock.release()
+
+        @functools.wraps(func)
+        def wrapper(df, *args):
+            df_id = id(df)
+            with lock:
+                purge()
+                token = tokens.get(df_id)
+                if token is None:
+                    token = next(_TOKENS)
+                    tokens[df_id] = token
+                    weakref.finalize(df, release, df_id, token)
+                key = (token, args)
+                if key in results:
+                    results.move_to_end(key)
+                    return results[key]
+
+            result = func(df, *args)
+
+            with lock:
+                results[key] = result
+                results.move_to_end(key)
+                while len(results) > maxsize:
+                    results.popitem(last=False)
+            return result
+
+        def cache_clear():
+            with lock:
+                results.clear()
+
+        wrapper.cache_clear = cache_clear
+        return wrapper
+
+    return decorator
@@ -0,0 +1,58 @@
+"""
+Kernel compilado con Numba para normalizar y ponderar la matriz de scoring.
+
+Numba es opcional: si no está instalado, NUMBA_AVAILABLE es False y
+calculate_fund_score usa la versión NumPy equivalente.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+if NUMBA_AVAILABLE:
+    # Sin parallel=True: Streamlit llama desde varios hilos y las capas de
+    # hilos de Numba abortan o bloquean el proceso; con k <= 8 columnas no
+    # compensa. fastmath sin 'nnan'/'ninf': las comprobaciones de NaN deben mantenerse
+    @njit(cache=True, fastmath={'nsz', 'arcp', 'contract', 'afn', 'reassoc'})
+    def _score(X, directions, weights, out, comp_out):
+        """
+        Normaliza (min-max) y pondera cada columna de X en comp_out y
+        deja en out la suma por fila.
+
+        directions: 1 mayor es mejor, -1 menor es mejor, 0 sin normalizar.
+        Las columnas constantes puntúan 0.5 y las columnas sin datos, 0.
+        """
+        n, k = X.shape
+        for j in range(k):
+            mn = np.inf
+            mx = -np.inf
+            for i in range(n):
+                x = X[i, j]
+                if not np.isnan(x):
+                    if x < mn:
+                        mn = x
+                    if x > mx:
+                        mx = x
+            for i in range(n):
+                x = X[i, j]
+                if np.isnan(x):
+                    v = 0.0
+                elif directions[j] == 0:
+                    v = x
+                elif mx == mn:
+                    v = 0.5
+                else:
+                    v = (x - mn) / (mx - mn)
+                    if directions[j] < 0:
+                        v = 1.0 - v
+                comp_out[i, j] = v * weights[j]
+        for i in range(n):
+            acc = 0.0
+            for j in range(k):
+                acc += comp_out[i, j]
+            out[i] = acc
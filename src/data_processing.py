@@ -2,11 +2,57 @@
 Módulo de procesamiento y limpieza de datos de fondos de inversión.
 """
 
+import os
+import tempfile
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
 import re
 
 
+_CURRENCY_RE = re.compile(r'([\d.]+),(\d+)')
+_NUMBER_RE = re.compile(r'([\d.]+)')
+# Literales que acepta float(): signo, punto inicial o final, exponente,
+# separadores '_' entre dígitos e inf/nan
+_DIGITS = r'\d(?:_?\d)*'
+_DECIMAL_PATTERN = (
+    rf'(?i)^[+-]?(?:(?:{_DIGITS}(?:\.(?:{_DIGITS})?)?|\.{_DIGITS})(?:e[+-]?{_DIGITS})?'
+    r'|inf(?:inity)?|nan)$'
+)
+
+# Columnas de porcentaje a limpiar
+PERCENTAGE_COLS = [
+    'Ren. año actual', 'Ren. últ. 12 meses', 'Ren. últ. 36 meses', 
+    'Ren. últ. 60 meses', 'Ren. 2025', 'Ren. 2024', 'Ren. 2023', 'Ren. 2022',
+    'Comisión TER', 'Comisión gestión', 'Comisión suscripción', 'Comisión reembolso',
+    'Taxonomía de la UE', 'Reglamento de Divulgación',
+    'Sharpe Ratio', 'Beta', 'Jensen Alpha', 'Aplha', 'Máxima caída del fondo'
+]
+
+# Columnas de moneda
+CURRENCY_COLS = ['Valor liquidativo', 'Patrimonio (millones)', 'Importe mínimo primera compra']
+
+# Resto de columnas del Excel: las que usa la app y las que solo se exportan
+# en el CSV del Top 10 ('page', 'PIAS', 'Antigüedad del fondo', 'Ultimo dividendo')
+METADATA_COLS = [
+    'page', 'fund_id', 'fund_name', 'fund_manager', 'isin', 'min_first_buy',
+    'Pref. Sostenibilidad', 'PIAS', 'Nivel de riesgo', 'Rating Morningstar',
+    'R. Morningstar Sostenibilidad', 'Tipo de activo', 'Región', 'Divisa',
+    'Beneficios', 'Participes', 'Divisa cubierta', 'Antigüedad del fondo',
+    'Ultimo dividendo'
+]
+
+# Columnas de filtro con pocos valores distintos, guardadas como categóricas
+CATEGORICAL_COLS = [
+    'Tipo de activo', 'Región', 'Divisa', 'fund_manager', 'Beneficios',
+    'Pref. Sostenibilidad', 'moneda_minimo'
+]
+
+# Columnas que se leen del Excel; el resto se descarta al cargar
+USED_COLUMNS = METADATA_COLS + PERCENTAGE_COLS + CURRENCY_COLS
+
+
 def clean_percentage(value):
     """Convierte strings de porcentaje a float (ej: '1,41%' -> 0.0141)"""
     if pd.isna(value) or value == 'N/D':
@@ -28,13 +74,13 @@ def clean_currency(value):
         return value
     try:
         # Extraer número con posibles decimales usando coma
-        match = re.search(r'([\d.]+),(\d+)', str(value))
+        match = _CURRENCY_RE.search(str(value))
         if match:
             integer_part = match.group(1).replace('.', '')
             decimal_part = match.group(2)
             return float(f"{integer_part}.{decimal_part}")
         # Intentar extraer solo número
-        match = re.search(r'[\d.]+', str(value).replace(',', '.'))
+        match = _NUMBER_RE.search(str(value).replace(',', '.'))
         if match:
             return float(match.group())
         return np.nan
@@ -65,59 +111,188 @@ def clean_risk_level(value):
         return np.nan
 
 
-def load_and_clean_data(filepath='funds.xlsx'):
+def _vec_clean_percentage(s: pd.Series) -> pd.Series:
+    """Versión vectorizada de clean_percentage usando los kernels de Arrow."""
+    if pd.api.types.is_numeric_dtype(s):
+        return s.astype(float)
+    arr = pa.array(s.astype('string').to_numpy(dtype=object, na_value=None), type=pa.string())
+    null = pa.scalar(None, type=pa.string())
+    arr = pc.if_else(pc.equal(arr, 'N/D'), null, arr)
+    arr = pc.utf8_trim_whitespace(
+        pc.replace_substring(pc.replace_substring(arr, '%', ''), ',', '.')
+    )
+    # Textos no numéricos (ej: '4% durante los 30 primeros días') a nulo antes del cast
+    arr = pc.if_else(pc.match_substring_regex(arr, _DECIMAL_PATTERN), arr, null)
+    # Arrow no admite los '_' que sí acepta float()
+    arr = pc.replace_substring(arr, '_', '')
+    cleaned = pc.divide(pc.cast(arr, pa.float64(), safe=False), 100.0)
+    return pd.Series(pd.arrays.ArrowExtensionArray(cleaned), index=s.index)
+
+
+def _vec_clean_currency(s: pd.Series) -> pd.Series:
+    """Versión vectorizada de clean_currency para una columna completa."""
+    if pd.api.types.is_numeric_dtype(s):
+        return s.astype(float)
+    s = s.astype('string').mask(s == 'N/D')
+    parts = s.str.extract(_CURRENCY_RE)
+    result = pd.to_numeric(
+        parts[0].str.replace('.', '', regex=False) + '.' + parts[1],
+        errors='coerce'
+    )
+    # Sin coma decimal: extraer solo el número
+    fallback = pd.to_numeric(
+        s.str.replace(',', '.', regex=False).str.extract(_NUMBER_RE)[0],
+        errors='coerce'
+    )
+    return result.where(parts[0].notna(), fallback)
+
+
+def _vec_clean_numeric_spanish(s: pd.Series) -> pd.Series:
+    """Versión vectorizada de clean_numeric_spanish para una columna completa."""
+    if pd.api.types.is_numeric_dtype(s):
+        return s.astype(float)
+    mask = s.isna() | (s == 'N/D')
+    cleaned = (
+        s.astype(str)
+        .str.replace('.', '', regex=False)
+        .str.replace(',', '.', regex=False)
+        .str.strip()
+    )
+    out = pd.to_numeric(cleaned, errors='coerce')
+    out[mask] = np.nan
+    return out
+
+
+def _normalize_dtypes(df):
+    """
+    Deja el DataFrame con tipos respaldados por Arrow (cadenas contiguas,
+    nulos nativos) y las columnas de filtro con pocos valores distintos
+    como categóricas.
+    """
+    # Las categóricas (p. ej. leídas de Parquet) se convierten como el resto
+    # para que sus categorías acaben con el mismo tipo
+    cat_cols = [col for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)]
+    if cat_cols:
+        df = df.astype({col: object for col in cat_cols})
+    df = df.convert_dtypes(dtype_backend='pyarrow')
+    
+    for col in CATEGORICAL_COLS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    return df
+
+
+def _cache_is_fresh(filepath, cache):
+    """Indica si la caché Parquet es más reciente que el Excel y que este módulo."""
+    if not os.path.exists(cache):
+        return False
+    source_mtime = max(os.path.getmtime(filepath), os.path.getmtime(__file__))
+    return os.path.getmtime(cache) >= source_mtime
+
+
+def _write_cache(df, cache):
+    """
+    Guarda la caché Parquet de forma atómica: se escribe en un temporal del
+    mismo directorio y se mueve a su sitio, de modo que una escritura
+    interrumpida (o dos procesos arrancando a la vez) nunca deja un archivo
+    a medias en la ruta final.
+    """
+    directory = os.path.dirname(os.path.abspath(cache))
+    tmp = None
+    try:
+        fd, tmp = tempfile.mkstemp(
+            dir=directory, prefix=os.path.basename(cache) + '.', suffix='.tmp'
+        )
+        os.close(fd)
+        df.to_parquet(tmp, compression='zstd')
+        os.replace(tmp, cache)
+    except (OSError, ImportError, ValueError, TypeError):
+        # Sin pyarrow o sistema de ficheros de solo lectura: seguir sin caché
+        if tmp is not None and os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def load_and_clean_data(filepath='funds.xlsx', cache=None):
     """
     Carga y limpia el archivo de fondos.
     
+    El resultado limpio se guarda en Parquet junto al Excel, de forma que los
+    arranques posteriores leen la caché en lugar de volver a parsear el Excel.
+    La caché se regenera si el Excel (o este módulo) es más reciente.
+    
     Parameters:
     -----------
     filepath : str
         Ruta al archivo Excel con los datos de fondos
+    cache : str or bool
+        Ruta al archivo Parquet de caché. Por defecto, el mismo nombre que
+        el Excel con extensión .parquet. False desactiva la caché.
         
     Returns:
     --------
     pd.DataFrame
         DataFrame limpio con columnas numéricas procesadas
     """
-    df = pd.read_excel(filepath)
-    
-    # Columnas de porcentaje a limpiar
-    percentage_cols = [
-        'Ren. año actual', 'Ren. últ. 12 meses', 'Ren. últ. 36 meses', 
-        'Ren. últ. 60 meses', 'Ren. 2025', 'Ren. 2024', 'Ren. 2023', 'Ren. 2022',
-        'Comisión TER', 'Comisión gestión', 'Comisión suscripción', 'Comisión reembolso',
-        'Taxonomía de la UE', 'Reglamento de Divulgación',
-        'Sharpe Ratio', 'Beta', 'Jensen Alpha', 'Aplha', 'Máxima caída del fondo'
-    ]
-    
-    for col in percentage_cols:
+    if cache is None:
+        cache = os.path.splitext(filepath)[0] + '.parquet'
+    
+    if cache and _cache_is_fresh(filepath, cache):
+        # Parquet no conserva el tipo de las cadenas ni de las categorías:
+        # se normaliza igual que tras la limpieza para obtener el mismo esquema
+        try:
+            return _normalize_dtypes(pd.read_parquet(cache))
+        except (OSError, ValueError, pa.ArrowException):
+            # Caché dañada o incompleta: se regenera desde el Excel
+            pass
+    
+    df = pd.read_excel(
+        filepath,
+        usecols=lambda col: col in USED_COLUMNS,
+        dtype={col: 'string' for col in PERCENTAGE_COLS + CURRENCY_COLS + ['min_first_buy']}
+    )
+    
+    # Las columnas derivadas se acumulan y se añaden de una vez (sin fragmentar el DataFrame)
+    new_cols = {}
+    
+    for col in PERCENTAGE_COLS:
         if col in df.columns:
-            df[col + '_clean'] = df[col].apply(clean_percentage)
+            new_cols[col + '_clean'] = _vec_clean_percentage(df[col])
     
     # Columnas de moneda
-    currency_cols = ['Valor liquidativo', 'Patrimonio (millones)', 'Importe mínimo primera compra']
-    for col in currency_cols:
+    for col in CURRENCY_COLS:
         if col in df.columns:
-            df[col + '_clean'] = df[col].apply(clean_currency)
+            new_cols[col + '_clean'] = _vec_clean_currency(df[col])
     
     # min_first_buy especial (tiene 'ISIN' en el string)
-    df['min_first_buy_clean'] = df['min_first_buy'].apply(clean_currency)
+    new_cols['min_first_buy_clean'] = _vec_clean_currency(df['min_first_buy'])
     
     # Nivel de riesgo
-    df['Nivel de riesgo_clean'] = df['Nivel de riesgo'].apply(clean_risk_level)
+    new_cols['Nivel de riesgo_clean'] = df['Nivel de riesgo'].apply(clean_risk_level)
     
     # Participes
-    df['Participes_clean'] = df['Participes'].apply(clean_numeric_spanish)
+    new_cols['Participes_clean'] = _vec_clean_numeric_spanish(df['Participes'])
     
     # Crear columnas auxiliares útiles
-    df['es_sostenible'] = df['Pref. Sostenibilidad'] == 'Sí'
-    df['es_acumulado'] = df['Beneficios'] == 'Acumulado'
-    df['divisa_cubierta'] = df['Divisa cubierta'] == 'Sí'
+    new_cols['es_sostenible'] = (df['Pref. Sostenibilidad'] == 'Sí').astype(bool)
+    new_cols['es_acumulado'] = (df['Beneficios'] == 'Acumulado').astype(bool)
+    new_cols['divisa_cubierta'] = (df['Divisa cubierta'] == 'Sí').astype(bool)
     
     # Extraer moneda del min_first_buy
-    df['moneda_minimo'] = df['min_first_buy'].apply(
-        lambda x: 'EUR' if '€' in str(x) else ('USD' if '$' in str(x) else 'Otra')
-    )
+    min_buy = df['min_first_buy'].astype('string')
+    new_cols['moneda_minimo'] = pd.Series(np.select(
+        [
+            min_buy.str.contains('€', regex=False, na=False).to_numpy(dtype=bool),
+            min_buy.str.contains('$', regex=False, na=False).to_numpy(dtype=bool),
+        ],
+        ['EUR', 'USD'],
+        default='Otra'
+    ), index=df.index)
+    
+    df = pd.concat([df, pd.DataFrame(new_cols, index=df.index)], axis=1, copy=False)
+    df = _normalize_dtypes(df)
+    
+    if cache:
+        _write_cache(df, cache)
     
     return df
 
@@ -5,11 +5,39 @@ Módulo de filtros para fondos de inversión.
 import pandas as pd
 import numpy as np
 
+from ._frame_cache import memoize_by_frame
+
+
+def _opts(series):
+    """Valores distintos de una columna, sin nulos ni 'N/D'."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        values = series.cat.categories
+    else:
+        values = series.dropna().unique()
+    return [x for x in values if x != 'N/D']
+
+
+@memoize_by_frame(maxsize=1)
+def _filter_options_cached(df):
+    return {
+        'tipo_activo': sorted(_opts(df['Tipo de activo'])),
+        'region': sorted(_opts(df['Región'])),
+        'divisa': sorted(_opts(df['Divisa'])),
+        'nivel_riesgo': list(range(1, 8)),
+        'rating_morningstar': [1, 2, 3, 4, 5],
+        # Las 50 gestoras con más fondos, en orden alfabético
+        'gestoras': df['fund_manager'].dropna().value_counts().nlargest(50).index.sort_values().tolist(),
+        'beneficios': ['Acumulado', 'Distribuido'],
+    }
+
 
 def get_filter_options(df):
     """
     Obtiene las opciones disponibles para cada filtro.
     
+    El resultado se cachea por DataFrame, que debe tratarse como inmutable
+    una vez cargado.
+    
     Parameters:
     -----------
     df : pd.DataFrame
@@ -20,16 +48,17 @@ def get_filter_options(df):
     dict
         Diccionario con las opciones para cada filtro
     """
-    options = {
-        'tipo_activo': sorted([x for x in df['Tipo de activo'].unique() if pd.notna(x) and x != 'N/D']),
-        'region': sorted([x for x in df['Región'].unique() if pd.notna(x) and x != 'N/D']),
-        'divisa': sorted([x for x in df['Divisa'].unique() if pd.notna(x) and x != 'N/D']),
-        'nivel_riesgo': list(range(1, 8)),
-        'rating_morningstar': [1, 2, 3, 4, 5],
-        'gestoras': sorted([x for x in df['fund_manager'].unique() if pd.notna(x)])[:50],
-        'beneficios': ['Acumulado', 'Distribuido'],
-    }
-    return options
+    return _filter_options_cached(df)
+
+
+def _to_mask(series):
+    """Convierte una serie booleana (posiblemente con nulos) en ndarray, nulos como False."""
+    return series.to_numpy(dtype=bool, na_value=False)
+
+
+def _to_float(series):
+    """Extrae una columna numérica como ndarray float, con nulos como NaN."""
+    return series.to_numpy(dtype=float, na_value=np.nan)
 
 
 def apply_filters(df, filters):
@@ -48,91 +77,79 @@ def apply_filters(df, filters):
     pd.DataFrame
         DataFrame filtrado
     """
-    filtered = df.copy()
+    # Una única máscara booleana acumulada sobre el DataFrame original
+    mask = np.ones(len(df), dtype=bool)
     
     # Filtro por tipo de activo
     if filters.get('tipo_activo'):
-        filtered = filtered[filtered['Tipo de activo'].isin(filters['tipo_activo'])]
+        mask &= df['Tipo de activo'].isin(filters['tipo_activo']).to_numpy()
     
     # Filtro por región
     if filters.get('region'):
-        filtered = filtered[filtered['Región'].isin(filters['region'])]
+        mask &= df['Región'].isin(filters['region']).to_numpy()
     
     # Filtro por divisa
     if filters.get('divisa'):
-        filtered = filtered[filtered['Divisa'].isin(filters['divisa'])]
+        mask &= df['Divisa'].isin(filters['divisa']).to_numpy()
     
     # Filtro por nivel de riesgo
     if filters.get('nivel_riesgo_min') is not None:
-        filtered = filtered[filtered['Nivel de riesgo_clean'] >= filters['nivel_riesgo_min']]
+        mask &= _to_float(df['Nivel de riesgo_clean']) >= filters['nivel_riesgo_min']
     if filters.get('nivel_riesgo_max') is not None:
-        filtered = filtered[filtered['Nivel de riesgo_clean'] <= filters['nivel_riesgo_max']]
+        mask &= _to_float(df['Nivel de riesgo_clean']) <= filters['nivel_riesgo_max']
     
-    # Filtro por rating Morningstar (solo si hay datos)
+    # Filtro por rating Morningstar (los fondos sin rating no se excluyen)
     if filters.get('rating_min') is not None:
-        if filtered['Rating Morningstar'].notna().any():
-            filtered = filtered[
-                (filtered['Rating Morningstar'].isna()) |
-                (filtered['Rating Morningstar'] >= filters['rating_min'])
-            ]
+        arr = _to_float(df['Rating Morningstar'])
+        mask &= np.isnan(arr) | (arr >= filters['rating_min'])
     
     # Filtro por inversión mínima del cliente
     if filters.get('inversion_cliente') is not None:
         inversion = filters['inversion_cliente']
         tolerancia = filters.get('tolerancia_minimo', 0.1)
         umbral = inversion * (1 + tolerancia)
-        filtered = filtered[
-            (filtered['min_first_buy_clean'].isna()) | 
-            (filtered['min_first_buy_clean'] <= umbral)
-        ]
+        arr = _to_float(df['min_first_buy_clean'])
+        mask &= np.isnan(arr) | (arr <= umbral)
     
     # Filtro solo sostenibles
     if filters.get('solo_sostenibles'):
-        filtered = filtered[filtered['es_sostenible'] == True]
+        mask &= _to_mask(df['es_sostenible'])
     
     # Filtro por tipo de beneficio
     if filters.get('solo_acumulado'):
-        filtered = filtered[filtered['Beneficios'] == 'Acumulado']
+        mask &= _to_mask(df['Beneficios'] == 'Acumulado')
     if filters.get('solo_distribuido'):
-        filtered = filtered[filtered['Beneficios'] == 'Distribuido']
+        mask &= _to_mask(df['Beneficios'] == 'Distribuido')
     
     # Filtro por divisa cubierta
     if filters.get('divisa_cubierta'):
-        filtered = filtered[filtered['divisa_cubierta'] == True]
+        mask &= _to_mask(df['divisa_cubierta'])
     
     # Filtro por comisión TER máxima
     if filters.get('comision_ter_max') is not None:
-        filtered = filtered[
-            (filtered['Comisión TER_clean'].isna()) |
-            (filtered['Comisión TER_clean'] <= filters['comision_ter_max'])
-        ]
+        arr = _to_float(df['Comisión TER_clean'])
+        mask &= np.isnan(arr) | (arr <= filters['comision_ter_max'])
     
     # Filtro por rendimiento mínimo 12 meses
     if filters.get('rendimiento_12m_min') is not None:
-        filtered = filtered[
-            (filtered['Ren. últ. 12 meses_clean'].isna()) |
-            (filtered['Ren. últ. 12 meses_clean'] >= filters['rendimiento_12m_min'])
-        ]
+        arr = _to_float(df['Ren. últ. 12 meses_clean'])
+        mask &= np.isnan(arr) | (arr >= filters['rendimiento_12m_min'])
     
     # Filtro por Sharpe ratio mínimo
     if filters.get('sharpe_min') is not None:
-        filtered = filtered[
-            (filtered['Sharpe Ratio_clean'].isna()) |
-            (filtered['Sharpe Ratio_clean'] >= filters['sharpe_min'])
-        ]
+        arr = _to_float(df['Sharpe Ratio_clean'])
+        mask &= np.isnan(arr) | (arr >= filters['sharpe_min'])
     
     # Filtro por gestoras
     if filters.get('gestoras'):
-        filtered = filtered[filtered['fund_manager'].isin(filters['gestoras'])]
+        mask &= df['fund_manager'].isin(filters['gestoras']).to_numpy()
     
     # Filtro por patrimonio mínimo
     if filters.get('patrimonio_min') is not None:
-        filtered = filtered[
-            (filtered['Patrimonio (millones)_clean'].isna()) |
-            (filtered['Patrimonio (millones)_clean'] >= filters['patrimonio_min'])
-        ]
+        arr = _to_float(df['Patrimonio (millones)_clean'])
+        mask &= np.isnan(arr) | (arr >= filters['patrimonio_min'])
     
-    return filtered
+    return df[mask]
 
 
 def filter_by_customer_profile(df, profile):
@@ -6,6 +6,11 @@ Sistema de puntuación basado en múltiples criterios con pesos ajustables.
 import pandas as pd
 import numpy as np
 
+from ._frame_cache import memoize_by_frame
+from ._scoring_kernel import NUMBA_AVAILABLE
+if NUMBA_AVAILABLE:
+    from ._scoring_kernel import _score
+
 
 # Perfiles predefinidos con pesos para cada criterio
 PRESET_PROFILES = {
@@ -82,8 +87,51 @@ PRESET_PROFILES = {
 }
 
 
+# Criterios de scoring: (clave del peso, columna, mayor es mejor)
+_CRITERIA = [
+    ('rendimiento_12m', 'Ren. últ. 12 meses_clean', True),
+    ('rendimiento_36m', 'Ren. últ. 36 meses_clean', True),
+    ('rendimiento_60m', 'Ren. últ. 60 meses_clean', True),
+    ('sharpe_ratio', 'Sharpe Ratio_clean', True),
+    ('riesgo_bajo', 'Nivel de riesgo_clean', False),
+    ('comisiones_bajas', 'Comisión TER_clean', False),
+    ('rating_morningstar', 'Rating Morningstar', True),
+    ('rating_sostenibilidad', 'R. Morningstar Sostenibilidad', True),
+]
+
+# Valores fijos para imputar nulos (el resto de criterios usa la mediana)
+_FILL_VALUES = {
+    'riesgo_bajo': 4,  # Asume riesgo medio si no hay dato
+    'rating_morningstar': 3,
+}
+
+# Orden fijo de los criterios en los vectores de pesos
+_CRITERIA_ORDER = tuple(key for key, _, _ in _CRITERIA)
+
+
+def _weights_to_vector(weights):
+    """Convierte un dict de pesos en un vector alineado con _CRITERIA_ORDER."""
+    vec = np.array([weights.get(key, 0.0) for key in _CRITERIA_ORDER], dtype=np.float32)
+    vec.setflags(write=False)
+    return vec
+
+
+# Vectores de pesos de los perfiles, precalculados al importar el módulo
+_PRESET_WEIGHT_VECS = {
+    name: _weights_to_vector(profile['weights'])
+    for name, profile in PRESET_PROFILES.items()
+}
+
+
 def get_preset_weights(profile_name):
-    """Obtiene los pesos de un perfil predefinido."""
+    """Obtiene los pesos de un perfil predefinido como vector alineado con _CRITERIA_ORDER."""
+    if profile_name in _PRESET_WEIGHT_VECS:
+        return _PRESET_WEIGHT_VECS[profile_name]
+    return _PRESET_WEIGHT_VECS['moderado']
+
+
+def get_preset_weights_dict(profile_name):
+    """Obtiene los pesos de un perfil predefinido como diccionario."""
     if profile_name in PRESET_PROFILES:
         return PRESET_PROFILES[profile_name]['weights']
     return PRESET_PROFILES['moderado']['weights']
@@ -101,21 +149,25 @@ def normalize_column(series, higher_is_better=True):
         Si True, valores altos obtienen puntuación alta
         Si False, valores bajos obtienen puntuación alta
     """
-    min_val = series.min()
-    max_val = series.max()
+    arr = series.to_numpy(dtype=np.float64, na_value=np.nan)
+    if arr.size == 0 or np.isnan(arr).all():
+        return pd.Series(np.nan, index=series.index)
+    
+    min_val = np.nanmin(arr)
+    value_range = np.nanmax(arr) - min_val
     
-    if max_val == min_val:
+    if value_range == 0:
         return pd.Series(0.5, index=series.index)
     
-    normalized = (series - min_val) / (max_val - min_val)
+    normalized = (arr - min_val) * (1.0 / value_range)
     
     if not higher_is_better:
-        normalized = 1 - normalized
+        normalized = 1.0 - normalized
     
-    return normalized
+    return pd.Series(normalized, index=series.index, copy=False)
 
 
-def calculate_fund_score(df, weights=None, custom_weights=None):
+def calculate_fund_score(df, weights=None, custom_weights=None, sort=True):
     """
     Calcula la puntuación de cada fondo basándose en múltiples criterios.
     
@@ -127,97 +179,101 @@ def calculate_fund_score(df, weights=None, custom_weights=None):
         Nombre del perfil predefinido ('conservador', 'moderado', 'agresivo', 'esg', 'largo_plazo')
     custom_weights : dict
         Pesos personalizados (sobreescribe el perfil si se proporciona)
+    sort : bool
+        Si False, devuelve los fondos en el orden original (sin ordenar)
         
     Returns:
     --------
     pd.DataFrame
-        DataFrame con columna 'score' añadida y ordenado por puntuación
+        DataFrame con columna 'score' añadida y ordenado por puntuación.
+        El resultado se memoiza por (DataFrame, pesos): no debe modificarse.
     """
-    scored = df.copy()
-    
     # Obtener pesos
     if custom_weights:
-        w = custom_weights
+        w_vec = _weights_to_vector(custom_weights)
     elif weights:
-        w = get_preset_weights(weights)
+        w_vec = get_preset_weights(weights)
     else:
-        w = get_preset_weights('moderado')
-    
-    # Calcular scores individuales normalizados
-    scores = pd.DataFrame(index=scored.index)
-    
-    # Rendimientos (higher is better)
-    if w.get('rendimiento_12m', 0) > 0:
-        scores['rendimiento_12m'] = normalize_column(
-            scored['Ren. últ. 12 meses_clean'].fillna(scored['Ren. últ. 12 meses_clean'].median()),
-            higher_is_better=True
-        ) * w['rendimiento_12m']
-    
-    if w.get('rendimiento_36m', 0) > 0:
-        scores['rendimiento_36m'] = normalize_column(
-            scored['Ren. últ. 36 meses_clean'].fillna(scored['Ren. últ. 36 meses_clean'].median()),
-            higher_is_better=True
-        ) * w['rendimiento_36m']
+        w_vec = get_preset_weights('moderado')
     
-    if w.get('rendimiento_60m', 0) > 0:
-        scores['rendimiento_60m'] = normalize_column(
-            scored['Ren. últ. 60 meses_clean'].fillna(scored['Ren. últ. 60 meses_clean'].median()),
-            higher_is_better=True
-        ) * w['rendimiento_60m']
-    
-    # Sharpe Ratio (higher is better)
-    if w.get('sharpe_ratio', 0) > 0:
-        scores['sharpe_ratio'] = normalize_column(
-            scored['Sharpe Ratio_clean'].fillna(scored['Sharpe Ratio_clean'].median()),
-            higher_is_better=True
-        ) * w['sharpe_ratio']
-    
-    # Riesgo bajo (lower risk = higher score)
-    if w.get('riesgo_bajo', 0) > 0:
-        scores['riesgo_bajo'] = normalize_column(
-            scored['Nivel de riesgo_clean'].fillna(4),  # Asume riesgo medio si no hay dato
-            higher_is_better=False
-        ) * w['riesgo_bajo']
+    return _calculate_fund_score_cached(df, tuple(w_vec.tolist()), sort)
+
+
+@memoize_by_frame(maxsize=32)
+def _calculate_fund_score_cached(df, weights_tuple, sort):
+    # Solo los criterios con peso > 0 entran en la matriz
+    active = [
+        (key, col, higher, weight)
+        for (key, col, higher), weight in zip(_CRITERIA, weights_tuple) if weight > 0
+    ]
+    keys = [key for key, _, _, _ in active]
+    cols = [col for _, col, _, _ in active]
+    directions = np.array([1.0 if higher else -1.0 for _, _, higher, _ in active], dtype=np.float32)
+    w_vec = np.array([weight for _, _, _, weight in active], dtype=np.float32)
     
-    # Comisiones bajas (lower is better)
-    if w.get('comisiones_bajas', 0) > 0:
-        scores['comisiones_bajas'] = normalize_column(
-            scored['Comisión TER_clean'].fillna(scored['Comisión TER_clean'].median()),
-            higher_is_better=False
-        ) * w['comisiones_bajas']
+    # Matriz (n_fondos, n_criterios) con los datos brutos; float32 basta para
+    # un score que se muestra con 1-2 decimales
+    X = df[cols].to_numpy(dtype=np.float32, na_value=np.nan)
     
-    # Rating Morningstar (higher is better) - solo si hay datos
-    if w.get('rating_morningstar', 0) > 0:
-        if scored['Rating Morningstar'].notna().any():
-            scores['rating_morningstar'] = normalize_column(
-                scored['Rating Morningstar'].fillna(3),
-                higher_is_better=True
-            ) * w['rating_morningstar']
-        else:
-            # Si no hay datos, dar puntuación neutral
-            scores['rating_morningstar'] = 0.5 * w['rating_morningstar']
+    # Sin rating de sostenibilidad: usar es_sostenible como proxy (sin normalizar)
+    if 'rating_sostenibilidad' in keys:
+        j_esg = keys.index('rating_sostenibilidad')
+        if np.isnan(X[:, j_esg]).all():
+            X[:, j_esg] = df['es_sostenible'].to_numpy(dtype=np.float32, na_value=0.0)
+            directions[j_esg] = 0.0
     
-    # Rating Sostenibilidad (higher is better) - usar es_sostenible como proxy si no hay datos
-    if w.get('rating_sostenibilidad', 0) > 0:
-        if scored['R. Morningstar Sostenibilidad'].notna().any():
-            scores['rating_sostenibilidad'] = normalize_column(
-                scored['R. Morningstar Sostenibilidad'].fillna(scored['R. Morningstar Sostenibilidad'].median()),
-                higher_is_better=True
-            ) * w['rating_sostenibilidad']
-        else:
-            # Usar es_sostenible como proxy
-            scores['rating_sostenibilidad'] = scored['es_sostenible'].astype(float) * w['rating_sostenibilidad']
+    # Imputar nulos con la mediana de cada columna (o el valor fijo del criterio)
+    median_cols = [col for key, col, _, _ in active if key not in _FILL_VALUES]
+    fill_values = df[median_cols].median().to_dict()
+    fill_values.update({col: _FILL_VALUES[key] for key, col, _, _ in active if key in _FILL_VALUES})
+    fill = pd.Series(fill_values, dtype=object)[cols].to_numpy(dtype=np.float32, na_value=np.nan)
+    X = np.where(np.isnan(X), fill, X)
     
-    # Calcular score total
-    scored['score'] = scores.sum(axis=1)
+    if NUMBA_AVAILABLE:
+        raw_scores = np.empty(X.shape[0], dtype=X.dtype)
+        components = np.empty_like(X)
+        _score(X, directions, w_vec, raw_scores, components)
+    else:
+        # Normalización min-max por columna; columnas constantes puntúan 0.5
+        mn = X.min(axis=0, initial=np.inf)
+        mx = X.max(axis=0, initial=-np.inf)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            Xn = np.where(mx == mn, 0.5, (X - mn) / (mx - mn))
+        Xn = np.where(directions < 0, 1.0 - Xn, Xn)
+        Xn = np.where(directions == 0, X, Xn)
+        # Columnas sin ningún dato no contribuyen
+        Xn = np.nan_to_num(Xn, nan=0.0)
+        
+        # Score total en una sola multiplicación matriz-vector
+        raw_scores = Xn @ w_vec
+        components = Xn * w_vec
     
-    # Normalizar score final a 0-100
-    scored['score'] = (scored['score'] / scored['score'].max()) * 100
+    # Score final en 0-100: cada criterio está en [0, 1], así que basta con
+    # dividir por la suma de pesos activos (comparable entre perfiles)
+    total_w = float(w_vec.sum())
+    if total_w > 0:
+        final_scores = raw_scores.astype(np.float64) * (100.0 / total_w)
+    else:
+        final_scores = np.zeros(len(raw_scores), dtype=np.float64)
     
     # Añadir scores individuales para transparencia
-    for col in scores.columns:
-        scored[f'score_{col}'] = scores[col]
+    score_block = pd.DataFrame(
+        {
+            'score': final_scores,
+            **{f'score_{key}': components[:, j] for j, key in enumerate(keys)},
+        },
+        index=df.index
+    )
     
+    # Añadir las columnas nuevas sin copiar el DataFrame original
+    existing = [col for col in score_block.columns if col in df.columns]
+    base = df.drop(columns=existing) if existing else df
+    scored = pd.concat([base, score_block], axis=1, copy=False)
+    # Columnas de componentes, para no tener que buscarlas al graficar
+    scored.attrs['score_cols'] = tuple(f'score_{key}' for key in keys)
+    
+    if not sort:
+        return scored
     return scored.sort_values('score', ascending=False)
 
 
@@ -241,8 +297,16 @@ def get_top_funds(df, n=10, weights='moderado', custom_weights=None):
     pd.DataFrame
         Top N fondos ordenados por puntuación
     """
-    scored = calculate_fund_score(df, weights=weights, custom_weights=custom_weights)
-    return scored.head(n)
+    scored = calculate_fund_score(df, weights=weights, custom_weights=custom_weights, sort=False)
+    
+    # Selección parcial de los n mejores y orden solo de esos n
+    neg_scores = -scored['score'].to_numpy()
+    if n < len(neg_scores):
+        idx = np.argpartition(neg_scores, n)[:n]
+    else:
+        idx = np.arange(len(neg_scores))
+    idx = idx[np.argsort(neg_scores[idx], kind='stable')]
+    return scored.iloc[idx]
 
 
 def explain_score(fund_row, weights='moderado'):
@@ -261,7 +325,7 @@ def explain_score(fund_row, weights='moderado'):
     dict
         Diccionario con la explicación del score
     """
-    w = get_preset_weights(weights)
+    w = get_preset_weights_dict(weights)
     
     explanation = {
         'fondo': fund_row.get('fund_name', 'N/A'),
@@ -0,0 +1,67 @@
+"""
+Módulo de tablas resumen de fondos.
+
+Solo depende de pandas/NumPy, de modo que la tabla del Top 10 se puede
+mostrar sin importar Plotly ni Matplotlib.
+"""
+
+import numpy as np
+
+
+def create_fund_summary_table(df, columns=None):
+    """
+    Crea una tabla resumen de fondos formateada.
+    
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        DataFrame con los fondos
+    columns : list
+        Columnas a incluir
+        
+    Returns:
+    --------
+    pd.DataFrame
+        DataFrame formateado para display
+    """
+    if columns is None:
+        columns = [
+            'fund_name', 'fund_manager', 'score', 'Tipo de activo', 'Región',
+            'Nivel de riesgo_clean', 'Rating Morningstar',
+            'Ren. últ. 12 meses_clean', 'Comisión TER_clean', 'min_first_buy_clean'
+        ]
+    
+    # Filtrar columnas existentes
+    available_cols = [c for c in columns if c in df.columns]
+    summary = df[available_cols].copy()
+    
+    # Renombrar columnas para display
+    rename_map = {
+        'fund_name': 'Nombre',
+        'fund_manager': 'Gestora',
+        'score': 'Score',
+        'Tipo de activo': 'Tipo',
+        'Región': 'Región',
+        'Nivel de riesgo_clean': 'Riesgo',
+        'Rating Morningstar': 'Rating ⭐',
+        'Ren. últ. 12 meses_clean': 'Rend. 12M',
+        'Comisión TER_clean': 'TER',
+        'min_first_buy_clean': 'Mín. Inversión'
+    }
+    
+    summary = summary.rename(columns={k: v for k, v in rename_map.items() if k in summary.columns})
+    
+    # Formatear valores
+    if 'Score' in summary.columns:
+        summary['Score'] = summary['Score'].round(1)
+    for col in ['Rend. 12M', 'TER']:
+        if col in summary.columns:
+            pct = summary[col].to_numpy(dtype=np.float64, na_value=np.nan) * 100
+            summary[col] = np.where(
+                np.isnan(pct), 'N/D', np.char.add(np.round(pct, 2).astype(str), '%')
+            )
+    if 'Mín. Inversión' in summary.columns:
+        vals = summary['Mín. Inversión'].to_numpy(dtype=np.float64, na_value=np.nan)
+        summary['Mín. Inversión'] = [f"€{v:,.0f}" if v == v else 'N/D' for v in vals]
+    
+    return summary
@@ -1,14 +1,25 @@
 """
 Módulo de visualizaciones para fondos de inversión.
+
+Se asume que el DataFrame viene de load_and_clean_data, que deja 'Tipo de
+activo', 'Región', 'Divisa' y 'fund_manager' como dtype category. Tras
+filtrar, esas columnas conservan categorías sin fondos: las agrupaciones
+usan observed=True y plot_risk_return_scatter descarta las categorías
+vacías antes de dibujar. Las columnas de texto normales también se aceptan.
 """
 
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-import plotly.express as px
+from matplotlib.lines import Line2D
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
+from ._frame_cache import memoize_by_frame
+
+# Reexportada por compatibilidad: la tabla no depende de Plotly/Matplotlib
+from .tables import create_fund_summary_table
+
 
 # Configuración de estilo
 COLORS = {
@@ -33,6 +44,13 @@ RISK_COLORS = {
 }
 
 
+def _trunc(series, n):
+    """
+    Trunca cada nombre a n caracteres (lista de Python; nulos como '').
+    """
+    return [s[:n] if isinstance(s, str) else '' for s in series.to_numpy()]
+
+
 def plot_risk_return_scatter(df, x_col='Nivel de riesgo_clean', y_col='Ren. últ. 12 meses_clean',
                               color_col='Tipo de activo', size_col=None, title=None,
                               highlight_funds=None, interactive=True):
@@ -64,6 +82,11 @@ def plot_risk_return_scatter(df, x_col='Nivel de riesgo_clean', y_col='Ren. últ
         print("No hay datos suficientes para el gráfico")
         return None
     
+    # Categorías que se han quedado sin fondos tras el dropna (ej: 'NOFAM'):
+    # fuera, para no generar grupos vacíos al agrupar o colorear
+    if isinstance(plot_df[color_col].dtype, pd.CategoricalDtype):
+        plot_df[color_col] = plot_df[color_col].cat.remove_unused_categories()
+    
     # Convertir rendimiento a porcentaje para visualización
     plot_df['y_pct'] = plot_df[y_col] * 100
     
@@ -71,25 +94,33 @@ def plot_risk_return_scatter(df, x_col='Nivel de riesgo_clean', y_col='Ren. últ
         title = 'Relación Riesgo - Rendimiento'
     
     if interactive:
-        fig = px.scatter(
-            plot_df,
-            x=x_col,
-            y='y_pct',
-            color=color_col,
-            hover_name='fund_name',
-            hover_data={
-                'fund_manager': True,
-                'Rating Morningstar': True,
-                'Comisión TER': True,
-                x_col: False,
-                'y_pct': ':.2f'
-            },
+        # Una traza WebGL por categoría, construida directamente desde ndarrays
+        hover_cols = ['fund_name', 'fund_manager', 'Rating Morningstar', 'Comisión TER']
+        hovertemplate = (
+            '<b>%{customdata[0]}</b><br>'
+            'Rendimiento (%)=%{y:.2f}<br>'
+            'fund_manager=%{customdata[1]}<br>'
+            'Rating Morningstar=%{customdata[2]}<br>'
+            'Comisión TER=%{customdata[3]}'
+            '<extra>%{fullData.name}</extra>'
+        )
+        
+        fig = go.Figure()
+        for tipo, sub in plot_df.groupby(color_col, observed=True, sort=False):
+            fig.add_trace(go.Scattergl(
+                x=sub[x_col].to_numpy(dtype=np.float64, na_value=np.nan),
+                y=sub['y_pct'].to_numpy(dtype=np.float64, na_value=np.nan),
+                mode='markers',
+                name=str(tipo),
+                customdata=sub[hover_cols].to_numpy(dtype=object, na_value=None),
+                hovertemplate=hovertemplate
+            ))
+        
+        fig.update_layout(
             title=title,
-            labels={
-                x_col: 'Nivel de Riesgo',
-                'y_pct': 'Rendimiento (%)',
-                color_col: 'Tipo de Activo'
-            }
+            xaxis_title='Nivel de Riesgo',
+            yaxis_title='Rendimiento (%)',
+            legend_title_text='Tipo de Activo'
         )
         
         if highlight_funds:
@@ -112,19 +143,34 @@ def plot_risk_return_scatter(df, x_col='Nivel de riesgo_clean', y_col='Ren. últ
     else:
         fig, ax = plt.subplots(figsize=(12, 8))
         
-        for tipo in plot_df[color_col].unique():
-            mask = plot_df[color_col] == tipo
-            ax.scatter(
-                plot_df.loc[mask, x_col],
-                plot_df.loc[mask, 'y_pct'],
-                label=tipo,
-                alpha=0.6
-            )
+        # Un único scatter coloreado por código de categoría (sin bucle por tipo).
+        # Con dtype category se usan los códigos ya calculados, sin hashing
+        color_values = plot_df[color_col]
+        if isinstance(color_values.dtype, pd.CategoricalDtype):
+            codes = color_values.cat.codes.to_numpy()
+            uniques = color_values.cat.categories
+        else:
+            codes, uniques = pd.factorize(color_values)
+        valid = codes >= 0
+        codes = codes[valid]
+        palette = plt.get_cmap('tab10')
+        ax.scatter(
+            plot_df[x_col].to_numpy(dtype=np.float64, na_value=np.nan)[valid],
+            plot_df['y_pct'].to_numpy(dtype=np.float64, na_value=np.nan)[valid],
+            c=palette(codes % 10),
+            alpha=0.6
+        )
+        
+        # Leyenda construida una sola vez a partir de las categorías
+        handles = [
+            Line2D([], [], marker='o', linestyle='', color=palette(i % 10), alpha=0.6, label=str(uniques[i]))
+            for i in np.unique(codes)
+        ]
         
         ax.set_xlabel('Nivel de Riesgo')
         ax.set_ylabel('Rendimiento (%)')
         ax.set_title(title)
-        ax.legend()
+        ax.legend(handles=handles)
         ax.grid(True, alpha=0.3)
         
         return fig
@@ -148,28 +194,29 @@ def plot_top_funds_comparison(df, n=10, metrics=None, title=None):
     if metrics is None:
         metrics = ['score', 'Ren. últ. 12 meses_clean', 'Sharpe Ratio_clean']
     
-    top_df = df.head(n).copy()
+    top_df = df.head(n)
     
     if title is None:
         title = f'Top {n} Fondos - Comparación'
     
     # Crear nombres cortos para el gráfico
-    top_df['short_name'] = top_df['fund_name'].str[:25] + '...'
+    short_names = [name + '...' for name in _trunc(top_df['fund_name'], 25)]
     
     fig = make_subplots(
         rows=1, cols=len(metrics),
         subplot_titles=['Score', 'Rendimiento 12M (%)', 'Sharpe Ratio'][:len(metrics)]
     )
     
+    # Bloque (n, métricas) con nulos a 0; porcentajes convertidos de una vez
+    block = top_df[metrics].to_numpy(dtype=np.float64, copy=True, na_value=0.0)
+    pct_mask = np.array(['Ren.' in m or m.endswith('_clean') for m in metrics])
+    block[:, pct_mask] *= 100.0
+    
     for i, metric in enumerate(metrics, 1):
-        values = top_df[metric].fillna(0)
-        if 'Ren.' in metric or metric.endswith('_clean'):
-            values = values * 100  # Convertir a porcentaje
-        
         fig.add_trace(
             go.Bar(
-                y=top_df['short_name'],
-                x=values,
+                y=short_names,
+                x=block[:, i - 1],
                 orientation='h',
                 name=metric,
                 marker_color=list(COLORS.values())[i-1]
@@ -240,19 +287,26 @@ def plot_fees_comparison(df, n=20, title=None):
     """
     Crea un gráfico comparando las comisiones de los fondos.
     """
-    plot_df = df.head(n).copy()
-    plot_df['short_name'] = plot_df['fund_name'].str[:20]
+    plot_df = df.head(n)[['fund_name', 'Comisión TER_clean', 'Comisión gestión_clean']]
+    short_names = _trunc(plot_df['fund_name'], 20)
     
     if title is None:
         title = 'Comparación de Comisiones'
     
+    # Bloque (n, 2) de comisiones en %: nulos a 0 y escalado sobre el mismo buffer
+    fees = plot_df[['Comisión TER_clean', 'Comisión gestión_clean']].to_numpy(
+        dtype=np.float64, copy=True, na_value=np.nan
+    )
+    np.nan_to_num(fees, copy=False, nan=0.0)
+    fees *= 100.0
+    
     fig = go.Figure()
     
     # TER
     fig.add_trace(go.Bar(
         name='Comisión TER',
-        y=plot_df['short_name'],
-        x=plot_df['Comisión TER_clean'].fillna(0) * 100,
+        y=short_names,
+        x=fees[:, 0],
         orientation='h',
         marker_color=COLORS['primary']
     ))
@@ -260,8 +314,8 @@ def plot_fees_comparison(df, n=20, title=None):
     # Gestión
     fig.add_trace(go.Bar(
         name='Comisión Gestión',
-        y=plot_df['short_name'],
-        x=plot_df['Comisión gestión_clean'].fillna(0) * 100,
+        y=short_names,
+        x=fees[:, 1],
         orientation='h',
         marker_color=COLORS['secondary']
     ))
@@ -283,15 +337,14 @@ def plot_distribution(df, column, title=None, bins=30):
     if title is None:
         title = f'Distribución de {column}'
     
-    fig = px.histogram(
-        df,
-        x=column,
-        nbins=bins,
-        title=title,
-        color_discrete_sequence=[COLORS['primary']]
-    )
+    fig = go.Figure(go.Histogram(
+        x=df[column].dropna().to_numpy(),
+        nbinsx=bins,
+        marker_color=COLORS['primary']
+    ))
     
     fig.update_layout(
+        title=title,
         xaxis_title=column,
         yaxis_title='Frecuencia'
     )
@@ -299,103 +352,61 @@ def plot_distribution(df, column, title=None, bins=30):
     return fig
 
 
+@memoize_by_frame(maxsize=16)
+def _grouped_by_category(df, category_col, value_col, agg):
+    # observed=True: ignora categorías sin fondos; sort=False: se ordena después
+    grouped = df.groupby(category_col, sort=False, observed=True)[value_col].agg(agg)
+    return grouped.sort_values(ascending=False)
+
+
 def plot_by_category(df, category_col, value_col, agg='mean', title=None):
     """
     Crea un gráfico de barras agrupado por categoría.
     """
-    if agg == 'mean':
-        grouped = df.groupby(category_col)[value_col].mean()
-    elif agg == 'median':
-        grouped = df.groupby(category_col)[value_col].median()
-    elif agg == 'count':
-        grouped = df.groupby(category_col)[value_col].count()
-    else:
-        grouped = df.groupby(category_col)[value_col].sum()
+    if agg not in ('mean', 'median', 'count', 'sum'):
+        agg = 'sum'
     
-    grouped = grouped.sort_values(ascending=False)
+    grouped = _grouped_by_category(df, category_col, value_col, agg)
     
     if title is None:
         title = f'{value_col} por {category_col}'
     
-    fig = px.bar(
-        x=grouped.index,
-        y=grouped.values * 100 if 'Ren.' in value_col else grouped.values,
+    values = grouped.to_numpy(dtype=np.float64, na_value=np.nan)
+    if 'Ren.' in value_col:
+        values = values * 100
+    
+    fig = go.Figure(go.Bar(
+        x=grouped.index.to_numpy(),
+        y=values
+    ))
+    fig.update_layout(
         title=title,
-        labels={'x': category_col, 'y': value_col}
+        xaxis_title=category_col,
+        yaxis_title=value_col
     )
     
     return fig
 
 
-def create_fund_summary_table(df, columns=None):
-    """
-    Crea una tabla resumen de fondos formateada.
-    
-    Parameters:
-    -----------
-    df : pd.DataFrame
-        DataFrame con los fondos
-    columns : list
-        Columnas a incluir
-        
-    Returns:
-    --------
-    pd.DataFrame
-        DataFrame formateado para display
-    """
-    if columns is None:
-        columns = [
-            'fund_name', 'fund_manager', 'score', 'Tipo de activo', 'Región',
-            'Nivel de riesgo_clean', 'Rating Morningstar',
-            'Ren. últ. 12 meses_clean', 'Comisión TER_clean', 'min_first_buy_clean'
-        ]
-    
-    # Filtrar columnas existentes
-    available_cols = [c for c in columns if c in df.columns]
-    summary = df[available_cols].copy()
-    
-    # Renombrar columnas para display
-    rename_map = {
-        'fund_name': 'Nombre',
-        'fund_manager': 'Gestora',
-        'score': 'Score',
-        'Tipo de activo': 'Tipo',
-        'Región': 'Región',
-        'Nivel de riesgo_clean': 'Riesgo',
-        'Rating Morningstar': 'Rating ⭐',
-        'Ren. últ. 12 meses_clean': 'Rend. 12M',
-        'Comisión TER_clean': 'TER',
-        'min_first_buy_clean': 'Mín. Inversión'
-    }
-    
-    summary = summary.rename(columns={k: v for k, v in rename_map.items() if k in summary.columns})
-    
-    # Formatear valores
-    if 'Score' in summary.columns:
-        summary['Score'] = summary['Score'].round(1)
-    if 'Rend. 12M' in summary.columns:
-        summary['Rend. 12M'] = (summary['Rend. 12M'] * 100).round(2).astype(str) + '%'
-    if 'TER' in summary.columns:
-        summary['TER'] = (summary['TER'] * 100).round(2).astype(str) + '%'
-    if 'Mín. Inversión' in summary.columns:
-        summary['Mín. Inversión'] = summary['Mín. Inversión'].apply(
-            lambda x: f"€{x:,.0f}" if pd.notna(x) else 'N/D'
-        )
-    
-    return summary
-
-
 def plot_score_breakdown(df, n=10):
     """
     Muestra el desglose del score para los top N fondos.
     """
-    top_df = df.head(n).copy()
+    top_df = df.head(n)
     
-    score_cols = [c for c in top_df.columns if c.startswith('score_') and c != 'score']
+    # calculate_fund_score deja la lista en attrs; si no, se busca por prefijo.
+    # attrs se propaga a subconjuntos de columnas: quedarse con las presentes
+    score_cols = df.attrs.get('score_cols')
+    if score_cols:
+        score_cols = [c for c in score_cols if c in top_df.columns]
+    else:
+        score_cols = [c for c in top_df.columns if c.startswith('score_') and c != 'score']
     
     if not score_cols:
         return None
     
+    # Etiquetas calculadas una vez, no una por componente
+    short_names = _trunc(top_df['fund_name'], 25)
     fig = go.Figure()
     
     # Nombres de componentes más legibles
@@ -415,7 +426,7 @@ def plot_score_breakdown(df, n=10):
     for i, col in enumerate(score_cols):
         fig.add_trace(go.Bar(
             name=component_names.get(col, col),
-            y=top_df['fund_name'].str[:25],
+            y=short_names,
             x=top_df[col] * 100,
             orientation='h',
             marker_color=colors[i % len(colors)]